@@ -113,7 +113,8 @@ class EmojiAdmin(admin.ModelAdmin):
                 emojis[emoji.shortcode] = emoji
 
         Emoji.objects.bulk_create(emojis.values(), batch_size=50, ignore_conflicts=True)
-        Emoji.locals = Emoji.load_locals()
+        # bulk_create doesn't send post_save, so invalidate by hand
+        Emoji.invalidate_locals()
 
 
 @admin.register(PostAttachment)
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.3 on 2026-08-29 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("activities", "0019_alter_postattachment_focal_x_and_more"),
+        ("users", "0022_follow_request"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="emoji",
+            index=models.Index(
+                fields=["shortcode", "local", "public", "domain"],
+                name="ix_emoji_shortcode_usable",
+            ),
+        ),
+    ]
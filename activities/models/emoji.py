@@ -1,14 +1,16 @@
 import mimetypes
-from functools import partial
-from typing import ClassVar
+from functools import cached_property, partial
 
 import httpx
 import urlman
 from cachetools import TTLCache, cached
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.safestring import mark_safe
 from PIL import Image
 
@@ -54,7 +56,7 @@ class EmojiStates(StateGraph):
 
                 instance.file = file
                 instance.mimetype = mimetype
-                instance.save()
+                instance.save(update_fields=["file", "mimetype", "updated"])
 
         return cls.updated
 
@@ -121,12 +123,16 @@ class Emoji(StatorModel):
 
     objects = EmojiManager()
 
-    # Cache of the local emojis {shortcode: Emoji}
-    locals: ClassVar["dict[str, Emoji]"]
-
     class Meta:
         unique_together = ("domain", "shortcode")
-        indexes: list = []  # We need this so Stator can add its own
+        indexes = [
+            # Covers the emojis_from_content lookup (Stator appends its own
+            # indexes to this list too)
+            models.Index(
+                fields=["shortcode", "local", "public", "domain"],
+                name="ix_emoji_shortcode_usable",
+            ),
+        ]
 
     class urls(urlman.Urls):
         admin = "/admin/emoji/"
@@ -137,6 +143,14 @@ class Emoji(StatorModel):
         admin_disable = "{admin}{self.pk}/disable/"
         admin_copy = "{admin}{self.pk}/copy/"
 
+    def save(self, *args, **kwargs):
+        # The file or visibility may have changed, so drop the per-instance
+        # caches before they can serve stale values
+        self.__dict__.pop("full_url_cached", None)
+        self.__dict__.pop("html", None)
+        self.__dict__.pop("mastodon_json", None)
+        super().save(*args, **kwargs)
+
     def delete(self, using=None, keep_parents=False):
         if self.file:
             self.file.delete()
@@ -150,22 +164,63 @@ class Emoji(StatorModel):
     def __str__(self):
         return f"{self.id}-{self.shortcode}"
 
+    # Cache key shared by all server processes for the locals build
+    locals_cache_key = "emoji:locals:v1"
+
+    @classmethod
+    @cached(cache=TTLCache(maxsize=1, ttl=300))
+    def get_locals(cls) -> dict[str, "Emoji"]:
+        """
+        Read-through accessor for the local emoji cache {shortcode: Emoji}.
+        The TTL bounds how stale this process can get when another process
+        changes an emoji; changes in this process invalidate it immediately
+        via the model signals.
+        """
+        return cls.load_locals()
+
     @classmethod
     def load_locals(cls) -> dict[str, "Emoji"]:
-        return {x.shortcode: x for x in Emoji.objects.usable().filter(local=True)}
+        return cache.get_or_set(cls.locals_cache_key, cls.build_locals, timeout=300)
+
+    @classmethod
+    def build_locals(cls) -> dict[str, "Emoji"]:
+        # Only pull the fields as_html/full_url need, to keep the rows small
+        return {
+            x.shortcode: x
+            for x in Emoji.objects.usable()
+            .filter(local=True)
+            .only(
+                "id",
+                "shortcode",
+                "public",
+                "file",
+                "remote_url",
+                "mimetype",
+                "category",
+            )
+        }
+
+    @classmethod
+    def invalidate_locals(cls):
+        cache.delete(cls.locals_cache_key)
+        cls.get_locals.cache.clear()
 
     @classmethod
     @cached(cache=TTLCache(maxsize=1000, ttl=60))
     def get_by_domain(cls, shortcode, domain: Domain | None) -> "Emoji | None":
         """
         Given an emoji shortcode and optional domain, looks up the single
-        emoji and returns it. Raises Emoji.DoesNotExist if there isn't one.
+        usable emoji and returns it, or None if there isn't one. Note that
+        usable() still lets through local emoji that are not publicly
+        visible, so local lookups need an is_usable check on top.
         """
         try:
             if domain is None or domain.local:
-                return cls.objects.get(local=True, shortcode=shortcode)
+                return cls.objects.usable().get(local=True, shortcode=shortcode)
             else:
-                return cls.objects.get(domain=domain, shortcode=shortcode)
+                return cls.objects.usable(domain).get(
+                    domain=domain, shortcode=shortcode
+                )
         except Emoji.DoesNotExist:
             return None
 
@@ -183,9 +238,18 @@ class Emoji(StatorModel):
         )
 
     def full_url_admin(self) -> RelativeAbsoluteUrl:
-        return self.full_url(always_show=True)
+        return self.build_full_url(always_show=True)
 
     def full_url(self, always_show=False) -> RelativeAbsoluteUrl:
+        if always_show:
+            return self.build_full_url(always_show=True)
+        return self.full_url_cached
+
+    @cached_property
+    def full_url_cached(self) -> RelativeAbsoluteUrl:
+        return self.build_full_url()
+
+    def build_full_url(self, always_show=False) -> RelativeAbsoluteUrl:
         if self.is_usable or always_show:
             if self.file:
                 return AutoAbsoluteUrl(self.file.url)
@@ -196,18 +260,24 @@ class Emoji(StatorModel):
                 )
         return StaticAbsoluteUrl("img/blank-emoji-128.png")
 
-    def as_html(self):
+    @cached_property
+    def html(self) -> str:
         if self.is_usable:
             return mark_safe(
                 f'<img src="{self.full_url().relative}" class="emoji" alt="Emoji {self.shortcode}">'
             )
         return self.fullcode
 
+    def as_html(self):
+        return self.html
+
     @property
     def can_copy_local(self):
-        if not hasattr(Emoji, "locals"):
-            Emoji.locals = Emoji.load_locals()
-        return not self.local and self.is_usable and self.shortcode not in Emoji.locals
+        return (
+            not self.local
+            and self.is_usable
+            and self.shortcode not in Emoji.get_locals()
+        )
 
     def copy_to_local(self, *, save: bool = True):
         """
@@ -232,9 +302,8 @@ class Emoji(StatorModel):
                 category=self.category,
             )
             if save:
+                # saving invalidates the locals cache for us
                 emoji.save()
-                # add this new one to the locals cache
-                Emoji.locals[self.shortcode] = emoji
         return emoji
 
     @classmethod
@@ -243,14 +312,38 @@ class Emoji(StatorModel):
         Return a parsed and sanitized of emoji found in content without
         the surrounding ':'.
         """
-        emoji_hits = FediverseHtmlParser(
-            content, find_emojis=True, emoji_domain=domain
-        ).emojis
-        emojis = sorted({emoji for emoji in emoji_hits})
+        return cls.emojis_from_contents([content], domain)
+
+    @classmethod
+    def emojis_from_contents(
+        cls, contents: list[str], domain: Domain | None
+    ) -> list["Emoji"]:
+        """
+        Batch version of emojis_from_content - parses each piece of content
+        but only issues a single query for the union of the shortcodes found.
+        """
+        emoji_hits: set[str] = set()
+        for content in contents:
+            # No colon means no shortcodes; skip the HTML parse entirely
+            if ":" not in content:
+                continue
+            # No tags means a plain regex scan finds the same candidates as
+            # the full HTML parse; the query below does the real filtering
+            if "<" not in content:
+                emoji_hits.update(FediverseHtmlParser.EMOJI_FINDALL(content))
+                continue
+            emoji_hits.update(
+                FediverseHtmlParser(
+                    content, find_emojis=True, emoji_domain=domain
+                ).emojis
+            )
+        if not emoji_hits:
+            return []
         return list(
-            cls.objects.filter(local=(domain is None) or domain.local)
-            .usable(domain)
-            .filter(shortcode__in=emojis)
+            cls.objects.usable(domain).filter(
+                local=(domain is None) or domain.local,
+                shortcode__in=emoji_hits,
+            )
         )
 
     def to_ap_tag(self):
@@ -320,22 +413,28 @@ class Emoji(StatorModel):
                     emoji.transition_perform("outdated")
                 return emoji
 
-        emoji = cls.objects.create(
-            shortcode=shortcode,
-            domain=None if domain.local else domain,
-            local=domain.local,
-            object_uri=data["id"],
-            mimetype=mimetype or "application/octet-stream",
-            category=category,
-            remote_url=icon["url"],
-        )
+        # get_or_create so concurrent ingestion of the same tag can't trip
+        # over the object_uri unique constraint
+        with transaction.atomic():
+            emoji, _ = cls.objects.get_or_create(
+                object_uri=data["id"],
+                defaults={
+                    "shortcode": shortcode,
+                    "domain": None if domain.local else domain,
+                    "local": domain.local,
+                    "mimetype": mimetype or "application/octet-stream",
+                    "category": category,
+                    "remote_url": icon["url"],
+                },
+            )
         return emoji
 
     ### Mastodon API ###
 
-    def to_mastodon_json(self):
+    @cached_property
+    def mastodon_json(self):
         url = self.full_url().absolute
-        data = {
+        return {
             "shortcode": self.shortcode,
             "url": url,
             "static_url": self.remote_url or url,
@@ -346,4 +445,17 @@ class Emoji(StatorModel):
             ),
             "category": self.category or "",
         }
-        return data
+
+    def to_mastodon_json(self):
+        return self.mastodon_json
+
+
+@receiver([post_save, post_delete], sender=Emoji)
+def invalidate_emoji_locals(sender, instance: Emoji, **kwargs):
+    """
+    Drops the locals cache when an emoji changes; it is rebuilt lazily on
+    next access. Note that bulk operations skip signals, so bulk callers
+    need to invalidate by hand.
+    """
+    if instance.local:
+        Emoji.invalidate_locals()
@@ -2,8 +2,31 @@ import html
 import re
 from html.parser import HTMLParser
 
+from django.conf import settings
 from django.utils.safestring import mark_safe
 
+from core.models import Config
+
+
+def compile_emoji_regex():
+    """
+    Compiles the emoji shortcode pattern with the engine selected by the
+    EMOJI_REGEX_ENGINE setting. RE2 scans post bodies as a DFA with no
+    backtracking, but it's an optional dependency, so the stdlib engine is
+    the fallback; both expose the same split/findall interface.
+    """
+    pattern = r"\B:([a-zA-Z0-9(_)-]+):\B"
+    engine = settings.SETUP.EMOJI_REGEX_ENGINE
+    if engine in ("auto", "re2"):
+        try:
+            import re2
+
+            return re2.compile(pattern)
+        except ImportError:
+            if engine == "re2":
+                raise
+    return re.compile(pattern, re.ASCII)
+
 
 class FediverseHtmlParser(HTMLParser):
     """
@@ -40,7 +63,19 @@ class FediverseHtmlParser(HTMLParser):
 
     HASHTAG_REGEX = re.compile(r"\B#([\w()]+\b)(?!;)")
 
-    EMOJI_REGEX = re.compile(r"\B:([a-zA-Z0-9(_)-]+):\B")
+    # The shortcode charset is pure ASCII, and re.ASCII keeps the \B checks on
+    # the byte-oriented fast path when the stdlib engine is in use
+    EMOJI_REGEX = compile_emoji_regex()
+
+    # Bound up front so the hot loops skip the attribute lookups per call
+    EMOJI_FINDALL = EMOJI_REGEX.findall
+
+    # Character sets the hand-rolled emoji scanner in linkify_emoji uses to
+    # mirror EMOJI_REGEX: the shortcode class, and ASCII \w for the \B checks
+    WORD_CHARS = frozenset(
+        "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+    )
+    EMOJI_CHARS = WORD_CHARS | frozenset("()-")
 
     URL_REGEX = re.compile(
         r"""(\(*  # Match any opening parentheses.
@@ -69,6 +104,11 @@ class FediverseHtmlParser(HTMLParser):
         self.find_mentions = find_mentions
         self.find_hashtags = find_hashtags
         self.find_emojis = find_emojis
+        # Snapshot the config flag once per parse rather than re-reading it
+        # for every emoji encountered
+        self.emoji_unreviewed_are_public = (
+            Config.system.emoji_unreviewed_are_public if find_emojis else False
+        )
         self.calculate_mentions(mentions)
         self._data_buffer = ""
         self.html_output = ""
@@ -213,11 +253,14 @@ class FediverseHtmlParser(HTMLParser):
         All return values from this function should be HTML-safe
         """
         hashtag = hashtag.lstrip("#")
-        self.hashtags.add(hashtag.lower())
+        # islower() is an allocation-free C scan, so the common all-lowercase
+        # case skips making a copy (and we were lowering twice here before)
+        lowered = hashtag if hashtag.islower() else hashtag.lower()
+        self.hashtags.add(lowered)
         if self.uri_domain:
-            return f'<a href="https://{self.uri_domain}/tags/{hashtag.lower()}/" class="mention hashtag" rel="tag">#{hashtag}</a>'
+            return f'<a href="https://{self.uri_domain}/tags/{lowered}/" class="mention hashtag" rel="tag">#{hashtag}</a>'
         else:
-            return f'<a href="/tags/{hashtag.lower()}/" rel="tag">#{hashtag}</a>'
+            return f'<a href="/tags/{lowered}/" rel="tag">#{hashtag}</a>'
 
     def create_emoji(self, shortcode) -> str:
         """
@@ -227,8 +270,20 @@ class FediverseHtmlParser(HTMLParser):
         """
         from activities.models import Emoji
 
-        emoji = Emoji.get_by_domain(shortcode, self.emoji_domain)
-        if emoji and emoji.is_usable:
+        # Local emoji come out of the precomputed locals map, skipping a
+        # query per shortcode; the map holds every local emoji (including
+        # disabled ones), so the visibility test stays. Remote lookups are
+        # visibility-filtered inside get_by_domain already.
+        if self.emoji_domain is None or self.emoji_domain.local:
+            emoji = Emoji.get_locals().get(shortcode)
+            if emoji and not (
+                emoji.public
+                or (emoji.public is None and self.emoji_unreviewed_are_public)
+            ):
+                emoji = None
+        else:
+            emoji = Emoji.get_by_domain(shortcode, self.emoji_domain)
+        if emoji:
             self.emojis.add(shortcode)
             return emoji.as_html()
         return f":{shortcode}:"
@@ -243,74 +298,97 @@ class FediverseHtmlParser(HTMLParser):
         # Split the string by the URL regex so we know what to escape and what
         # not to escape.
         bits = self.URL_REGEX.split(data)
-        result = ""
+        parts = []
         # Even indices are data we should pass though, odd indices are links
         for i, bit in enumerate(bits):
             # A link!
             if i % 2 == 1:
-                result += self.create_link(bit, bit)
+                parts.append(self.create_link(bit, bit))
             # Not a link
             elif self.mention_matches or self.find_mentions:
-                result += self.linkify_mentions(bit)
+                parts.append(self.linkify_mentions(bit))
             elif self.find_hashtags:
-                result += self.linkify_hashtags(bit)
+                parts.append(self.linkify_hashtags(bit))
             elif self.find_emojis:
-                result += self.linkify_emoji(bit)
+                parts.append(self.linkify_emoji(bit))
             else:
-                result += html.escape(bit)
-        return result
+                parts.append(html.escape(bit))
+        return "".join(parts)
 
     def linkify_mentions(self, data):
         """
         Linkifies mentions
         """
         bits = self.MENTION_REGEX.split(data)
-        result = ""
+        parts = []
         for i, bit in enumerate(bits):
             # Mention content
             if i % 3 == 2:
-                result += self.create_mention(bit)
+                parts.append(self.create_mention(bit))
             # Not part of a mention (0) or mention preamble (1)
             elif self.find_hashtags:
-                result += self.linkify_hashtags(bit)
+                parts.append(self.linkify_hashtags(bit))
             elif self.find_emojis:
-                result += self.linkify_emoji(bit)
+                parts.append(self.linkify_emoji(bit))
             else:
-                result += html.escape(bit)
-        return result
+                parts.append(html.escape(bit))
+        return "".join(parts)
 
     def linkify_hashtags(self, data):
         """
         Linkifies hashtags
         """
         bits = self.HASHTAG_REGEX.split(data)
-        result = ""
+        parts = []
         for i, bit in enumerate(bits):
             # Not part of a hashtag
             if i % 2 == 0:
                 if self.find_emojis:
-                    result += self.linkify_emoji(bit)
+                    parts.append(self.linkify_emoji(bit))
                 else:
-                    result += html.escape(bit)
+                    parts.append(html.escape(bit))
             # Hashtag content
             else:
-                result += self.create_hashtag(bit)
-        return result
+                parts.append(self.create_hashtag(bit))
+        return "".join(parts)
 
     def linkify_emoji(self, data):
         """
         Linkifies emoji
+
+        Scans for colons by hand rather than running EMOJI_REGEX; the
+        pattern is simple enough that find() plus set membership beats the
+        regex VM on typical post-sized content. The boundary checks mirror
+        the \\B assertions on either side of the pattern.
         """
-        bits = self.EMOJI_REGEX.split(data)
-        result = ""
-        for i, bit in enumerate(bits):
-            # Not part of an emoji
-            if i % 2 == 0:
-                result += html.escape(bit)
-            # Emoji content
+        pos = data.find(":")
+        if pos == -1:
+            return html.escape(data)
+        length = len(data)
+        parts = []
+        last = 0
+        while 0 <= pos < length - 1:
+            # The opening colon must not touch a word character on its left
+            if pos > 0 and data[pos - 1] in self.WORD_CHARS:
+                pos = data.find(":", pos + 1)
+                continue
+            end = pos + 1
+            while end < length and data[end] in self.EMOJI_CHARS:
+                end += 1
+            if (
+                end > pos + 1
+                and end < length
+                and data[end] == ":"
+                and (end + 1 == length or data[end + 1] not in self.WORD_CHARS)
+            ):
+                parts.append(html.escape(data[last:pos]))
+                parts.append(self.create_emoji(data[pos + 1 : end]))
+                last = end + 1
+                pos = data.find(":", last)
             else:
-                result += self.create_emoji(bit)
-        return result
+                pos = data.find(":", pos + 1)
+        parts.append(html.escape(data[last:]))
+        return "".join(parts)
 
     @property
     def html(self):
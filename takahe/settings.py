@@ -131,6 +131,11 @@ class Settings(BaseSettings):
     #: served through the image proxy.
     EMOJI_MAX_IMAGE_FILESIZE_KB: int = 200
 
+    #: Regex engine used for emoji shortcode scanning. "auto" uses the
+    #: RE2-backed google-re2 package when it's installed and falls back to the
+    #: stdlib engine; "re2" requires it; "re" forces the stdlib engine.
+    EMOJI_REGEX_ENGINE: Literal["auto", "re", "re2"] = "auto"
+
     #: Request timeouts to use when talking to other servers Either
     #: float or tuple of floats for (connect, read, write, pool)
     REMOTE_TIMEOUT: float | tuple[float, float, float, float] = 5.0
@@ -630,9 +630,7 @@ class Identity(StatorModel):
         if self.aliases:
             response["alsoKnownAs"] = self.aliases
         # Emoji
-        emojis = Emoji.emojis_from_content(
-            (self.name or "") + " " + (self.summary or ""), None
-        )
+        emojis = Emoji.emojis_from_contents([self.name or "", self.summary or ""], None)
         if emojis:
             response["tag"] = []
             for emoji in emojis:
@@ -1063,8 +1061,8 @@ class Identity(StatorModel):
         metadata_value_text = (
             " ".join([m["value"] for m in self.metadata]) if self.metadata else ""
         )
-        emojis = Emoji.emojis_from_content(
-            f"{self.name} {self.summary} {metadata_value_text}", self.domain
+        emojis = Emoji.emojis_from_contents(
+            [self.name or "", self.summary or "", metadata_value_text], self.domain
         )
         renderer = ContentRenderer(local=False)
         result = {
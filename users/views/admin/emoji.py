@@ -114,5 +114,5 @@ class EmojiCopyLocal(HTMXActionView):
 
     def action(self, emoji: Emoji):
         # Force reload locals cache to avoid potential for shortcode dupes
-        Emoji.locals = Emoji.load_locals()
+        Emoji.invalidate_locals()
         emoji.copy_to_local()